@@ -1,8 +1,121 @@
 #!/usr/bin/env python3
 
 import numpy as np
+import shutil
 import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# File header: number of points (uint32), coordinate dtype code ('d' or 'f'),
+# padding so the point data starts 16-byte aligned for SIMD loads
+_HEADER = struct.Struct('Ic11x')
+_POINT_DTYPES = (np.float64, np.float32)
+
+class GridIndex:
+    """
+    Uniform grid over 2D points with square cells of side cell_size, widened
+    by a small margin that absorbs floating-point rounding in the cell
+    assignment. Points within cell_size of each other therefore always fall in
+    the same or adjacent cells, so a radius query only scans the 3x3 block
+    around the query point.
+    Only occupied cells are stored, so memory grows with the number of points
+    rather than with the area of the bounding box.
+    """
+
+    def __init__(self, X, cell_size):
+        self.X = np.ascontiguousarray(X, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = cell_size
+        X = self.X
+
+        # Non-finite points are never within any radius of another point, so
+        # they are left out of the grid entirely
+        finite = np.flatnonzero(np.isfinite(X).all(axis=1))
+        cells = np.zeros((len(finite), 2), dtype=np.int64)
+        if len(finite) and cell_size > 0:
+            origin = X[finite].min(axis=0)
+            offsets = X[finite] - origin
+            # Subtracting and dividing each round by about one ulp of the
+            # result, so two points cell_size apart could come out more than
+            # one cell apart; widen the cells by a margin well above that
+            # error, relative to how many cells the coordinates span
+            magnitude = max(np.abs(X[finite]).max(), np.abs(origin).max()) / cell_size
+            margin = 16 * np.finfo(np.float64).eps * max(magnitude, 1.0)
+            scaled = offsets // (cell_size * (1 + margin))
+            # Grids too fine to number exactly keep every point in one cell,
+            # as does a non-positive cell size: queries become a full scan
+            if scaled.max() < 2**52:
+                cells = scaled.astype(np.int64)
+
+        # Point indices sorted by cell; occupied cell k owns order[starts[k]:starts[k + 1]]
+        self.cell_coords, cell_of, self.counts = np.unique(cells, axis=0, return_inverse=True,
+                                                           return_counts=True)
+        cell_of = cell_of.reshape(-1)
+        self.order = finite[np.argsort(cell_of, kind='stable')]
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)))
+        self.cell_of = np.full(len(X), -1, dtype=np.int64)  # -1: not in the grid
+        self.cell_of[finite] = cell_of
+        self.neighbor_cells = self._neighbor_cells()
+
+    def _neighbor_cells(self):
+        """
+        Return an (n_cells, 9) array holding, for every occupied cell, the ids
+        of the occupied cells in the 3x3 block around it, or -1 where empty.
+        """
+        neighbor_cells = np.full((len(self.cell_coords), 9), -1, dtype=np.int64)
+        if len(self.cell_coords) == 0:
+            return neighbor_cells
+
+        # Rank-compress rows and columns so cell keys fit in int64 however far
+        # apart the cells are; cell_coords is sorted, so the keys are too
+        rows, cols = self.cell_coords.T
+        row_values, row_ranks = np.unique(rows, return_inverse=True)
+        col_values, col_ranks = np.unique(cols, return_inverse=True)
+        keys = row_ranks * len(col_values) + col_ranks
+
+        offsets = [(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+        for j, (dr, dc) in enumerate(offsets):
+            row_ranks, row_found = _lookup(row_values, rows + dr)
+            col_ranks, col_found = _lookup(col_values, cols + dc)
+            cells, cell_found = _lookup(keys, row_ranks * len(col_values) + col_ranks)
+            neighbor_cells[:, j] = np.where(row_found & col_found & cell_found, cells, -1)
+        return neighbor_cells
+
+    def block_counts(self):
+        """
+        Return, for every point, the number of points (itself included) in the
+        3x3 block of cells around it: an upper bound on its neighbor count.
+        """
+        # Trailing zero count stands in for the empty (-1) neighbor cells and
+        # for points outside the grid
+        counts = np.append(self.counts, 0)
+        block = np.append(counts[self.neighbor_cells].sum(axis=1), 0)
+        return block[self.cell_of]
+
+    def query_radius(self, i, eps2):
+        """
+        Return indices of all points within sqrt(eps2) of point i, excluding i
+        itself. Takes the squared radius so callers can hoist it out of their
+        loop; the radius must not exceed the cell size of the index.
+        """
+        if self.cell_of[i] < 0:
+            return np.empty(0, dtype=np.intp)
+
+        runs = [self.order[self.starts[k]:self.starts[k + 1]]
+                for k in self.neighbor_cells[self.cell_of[i]] if k >= 0]
+        candidates = np.concatenate(runs)
+
+        diff = self.X[candidates] - self.X[i]
+        d2 = np.einsum('ij,ij->i', diff, diff)
+        neighbors = candidates[d2 <= eps2]
+        return neighbors[neighbors != i]
+
+def _lookup(values, targets):
+    """
+    Find targets in the sorted array values.
+    Returns: positions (clipped to a valid index), whether each target was found
+    """
+    positions = np.minimum(np.searchsorted(values, targets), len(values) - 1)
+    return positions, values[positions] == targets
 
 def generate_test_data(n_samples=300, n_centers=4, output_file='test_data.bin'):
     """
@@ -11,29 +124,31 @@ def generate_test_data(n_samples=300, n_centers=4, output_file='test_data.bin'):
     """
     return generate_test_data_with_params(n_samples, n_centers, 0.8, 5, output_file)
 
-def load_test_data(input_file='test_data.bin'):
+def load_test_data(input_file='test_data.bin', copy=True):
     """
     Load test data from binary file.
-    Returns: points (N, 2), labels
+    Returns: points (N, 2) as float64 or float32, int32 labels
+    With copy=False the arrays are read-only views of a memory map of the
+    file instead: they are only valid while that file is not rewritten or
+    truncated.
     """
     with open(input_file, 'rb') as f:
-        # Read number of points
-        n_points = struct.unpack('I', f.read(4))[0]
-
-        points = []
-        labels = []
+        # Read number of points and coordinate type
+        n_points, dtype_code = _HEADER.unpack(f.read(_HEADER.size))
+    dtypes = {np.dtype(dtype).char.encode(): np.dtype(dtype) for dtype in _POINT_DTYPES}
+    if dtype_code not in dtypes:
+        raise ValueError(f"Unsupported coordinate type in file: {input_file}")
+    dtype = dtypes[dtype_code]
 
-        # Read points
-        for _ in range(n_points):
-            x, y = struct.unpack('dd', f.read(16))
-            points.append([x, y])
+    # Map points followed by labels without reading them into memory
+    offset = _HEADER.size
+    points = np.memmap(input_file, dtype=dtype, mode='r', offset=offset, shape=(n_points, 2))
+    offset += points.nbytes
+    labels = np.memmap(input_file, dtype=np.int32, mode='r', offset=offset, shape=(n_points,))
 
-        # Read labels
-        for _ in range(n_points):
-            label = struct.unpack('i', f.read(4))[0]
-            labels.append(label)
-
-    return np.array(points), np.array(labels)
+    if copy:
+        return np.array(points), np.array(labels)
+    return points, labels
 
 def generate_multiple_test_cases():
     """Generate test cases with different data sizes and parameters"""
@@ -50,89 +165,184 @@ def generate_multiple_test_cases():
         (1000, 4, 0.8, 10, 'test_data_minpts_10.bin'),
     ]
 
+    # Cases that differ only in eps / min_samples share one dataset
+    datasets = {}
     for n_samples, n_centers, eps, min_samples, output_file in test_cases:
-        print(f"Generating {n_samples} points with {n_centers} centers (eps={eps}, min_samples={min_samples})...")
-        generate_test_data_with_params(n_samples, n_centers, eps, min_samples, output_file)
-        print(f"Saved to {output_file}\n")
+        datasets.setdefault((n_samples, n_centers), []).append((eps, min_samples, output_file))
+
+    # Datasets are independent and each writes its own files, so generate
+    # them in parallel; reports are printed in order once each one is done
+    with ProcessPoolExecutor() as executor:
+        futures = [executor.submit(_generate_sweep, n_samples, n_centers, sweep)
+                   for (n_samples, n_centers), sweep in datasets.items()]
+        for future in futures:
+            print(future.result(), end='')
 
-def generate_test_data_with_params(n_samples=300, n_centers=4, eps=0.8, min_samples=5, output_file='test_data.bin'):
+def _generate_sweep(n_samples, n_centers, sweep):
     """
-    Generate test data with specific DBSCAN parameters
+    Generate one dataset and write it once per (eps, min_samples, output_file)
+    in sweep. Runs in a worker process; returns the progress report as text.
     """
-    np.random.seed(42)
+    # Sample into the first file of the sweep and copy its header and points
+    # to the others before any labels are appended
+    first_file = sweep[0][2]
+    X, _ = sample_points(n_samples, n_centers, first_file, rng=np.random.default_rng(42))
+    for _, _, output_file in sweep[1:]:
+        shutil.copyfile(first_file, output_file)
 
-    # Generate clustered data manually
-    X = []
-    true_labels = []
+    # Index the points once; a grid built for the largest eps also answers
+    # every smaller radius
+    index = GridIndex(X, max(eps for eps, _, _ in sweep))
 
-    for center_idx in range(n_centers):
-        # Create cluster centers
-        center_x = np.random.uniform(-5, 5)
-        center_y = np.random.uniform(-5, 5)
+    report = ''
+    for eps, min_samples, output_file in sweep:
+        report += f"Generating {n_samples} points with {n_centers} centers (eps={eps}, min_samples={min_samples})...\n"
+        report += _label_and_write(X, n_centers, eps, min_samples, output_file, index)[1]
+        report += f"Saved to {output_file}\n\n"
+    return report
+
+def _label_and_write(X, n_centers, eps, min_samples, output_file, index=None):
+    """
+    Label X, append the labels to output_file, which must already hold the
+    header and points of X as written by sample_points, and summarize the result.
+    Returns: labels, progress report text
+    """
+    # Simple DBSCAN-like clustering for ground truth
+    labels = label_points(X, eps, min_samples, index)
+    append_labels(output_file, labels)
 
-        # Generate points around each center
-        cluster_size = n_samples // n_centers
-        for _ in range(cluster_size):
-            x = center_x + np.random.normal(0, 0.6)
-            y = center_y + np.random.normal(0, 0.6)
-            X.append([x, y])
-            true_labels.append(center_idx)
+    report = (f"Generated {len(X)} points with {n_centers} clusters\n"
+              f"Simple clustering found {int((np.unique(labels) != -1).sum())} clusters\n")
+    return labels, report
 
-    # Add some noise points
-    noise_points = n_samples // 10
-    for _ in range(noise_points):
-        x = np.random.uniform(-10, 10)
-        y = np.random.uniform(-10, 10)
-        X.append([x, y])
-        true_labels.append(-1)  # Noise
+def label_points(X, eps, min_samples, index=None):
+    """
+    Simple DBSCAN-like clustering used as ground truth.
+    Each unlabeled point with at least min_samples neighbors within eps starts
+    a new cluster together with its unlabeled neighbors.
+    index is an optional prebuilt GridIndex over X with cell size >= eps.
+    """
+    if len(X) == 0:
+        return np.empty(0, dtype=np.int32)
 
-    X = np.array(X)
-    true_labels = np.array(true_labels)
+    if index is None:
+        index = GridIndex(X, eps)
+    elif index.cell_size < eps:
+        raise ValueError(f"GridIndex cell size {index.cell_size} is smaller than eps {eps}")
 
-    # Simple DBSCAN-like clustering for ground truth
-    labels = np.full(len(X), -1)
+    labels = np.full(len(X), -1, dtype=np.int32)
     cluster_id = 0
+    eps2 = eps * eps if eps >= 0 else -1.0  # a negative radius matches nothing
+
+    # Points whose whole 3x3 block is too sparse can never be core points,
+    # so skip their radius queries; they may still join a neighbor's cluster
+    maybe_core = index.block_counts() > min_samples
 
     for i in range(len(X)):
-        if labels[i] != -1:
+        if labels[i] != -1 or not maybe_core[i]:
             continue
 
         # Find neighbors within eps
-        neighbors = []
-        for j in range(len(X)):
-            if i == j:
-                continue
-            dist = np.sqrt((X[i][0] - X[j][0])**2 + (X[i][1] - X[j][1])**2)
-            if dist <= eps:
-                neighbors.append(j)
+        neighbors = index.query_radius(i, eps2)
 
         if len(neighbors) >= min_samples:  # min_samples
             labels[i] = cluster_id
-            # Expand cluster (simplified)
-            for neighbor in neighbors:
-                if labels[neighbor] == -1:
-                    labels[neighbor] = cluster_id
+            # Expand cluster (simplified): claim the still-unlabeled neighbors
+            mask = labels[neighbors] == -1
+            labels[neighbors[mask]] = cluster_id
             cluster_id += 1
         else:
             labels[i] = -1
 
-    # Save data to binary file
+    return labels
+
+def sample_points(n_samples=300, n_centers=4, output_file='test_data.bin', dtype=np.float64, rng=None,
+                  out_points=None):
+    """
+    Sample clustered points plus uniform noise and write them, after the
+    header, to output_file. Labels are left to append_labels.
+    Coordinates are stored as dtype, either np.float64 or np.float32.
+    rng defaults to a Generator seeded with 42. out_points is an optional
+    C-contiguous float64 (M, 2) scratch buffer that callers can reuse across
+    calls; M must cover one cluster and the noise block, so M = n_samples
+    always suffices.
+    Returns: read-only view of the written points (N, 2), true cluster of each point
+    The view is a memory map of output_file: it is only valid while that file
+    is not rewritten or truncated, so copy it (np.array) before handing it out.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in _POINT_DTYPES:
+        raise ValueError(f"Unsupported coordinate dtype: {dtype}")
+
+    if rng is None:
+        rng = np.random.default_rng(42)
+
+    # No centers means a noise-only dataset
+    cluster_size = n_samples // n_centers if n_centers > 0 else 0
+    noise_points = n_samples // 10
+    chunk_size = max(cluster_size, noise_points)
+    # Validate the scratch buffer before output_file is truncated
+    if out_points is None:
+        out_points = np.empty((chunk_size, 2))
+    elif out_points.ndim != 2 or out_points.shape[1] != 2:
+        raise ValueError(f"out_points must have shape (M, 2), got {out_points.shape}")
+    elif out_points.dtype != np.float64 or not out_points.flags.c_contiguous:
+        raise ValueError("out_points must be a C-contiguous float64 array")
+    elif out_points.shape[0] < chunk_size:
+        raise ValueError(f"out_points needs at least {chunk_size} rows, got {out_points.shape[0]}")
+
+    n_points = n_centers * cluster_size + noise_points
+    true_labels = np.empty(n_points, dtype=np.int32)
+
+    # Stream points to disk as they are sampled so only one cluster is held
+    # in memory at a time
     with open(output_file, 'wb') as f:
-        # Write number of points
-        f.write(struct.pack('I', len(X)))
+        # Write number of points and coordinate type
+        f.write(_HEADER.pack(n_points, dtype.char.encode()))
 
-        # Write points as doubles (x, y)
-        for point in X:
-            f.write(struct.pack('dd', point[0], point[1]))
+        # Write points (x, y), one cluster at a time
+        centers = rng.uniform(-5, 5, size=(n_centers, 2))
+        chunk = out_points[:cluster_size]
+        for center_idx, center in enumerate(centers):
+            rng.standard_normal(out=chunk)
+            chunk *= 0.6
+            chunk += center
+            f.write(memoryview(chunk.astype(dtype, copy=False)))
+            true_labels[center_idx * cluster_size:(center_idx + 1) * cluster_size] = center_idx
 
+        # Add some noise points, uniform in [-10, 10)
+        chunk = out_points[:noise_points]
+        rng.random(out=chunk)
+        chunk *= 20
+        chunk -= 10
+        f.write(memoryview(chunk.astype(dtype, copy=False)))
+        true_labels[n_points - noise_points:] = -1  # Noise
+
+    X = np.memmap(output_file, dtype=dtype, mode='r', offset=_HEADER.size, shape=(n_points, 2))
+    return X, true_labels
+
+def append_labels(output_file, labels):
+    """
+    Append computed labels to a file written by sample_points.
+    """
+    with open(output_file, 'ab') as f:
         # Write computed labels for validation
-        for label in labels:
-            f.write(struct.pack('i', label))
+        f.write(memoryview(np.ascontiguousarray(labels, dtype=np.int32)))
+
+def generate_test_data_with_params(n_samples=300, n_centers=4, eps=0.8, min_samples=5, output_file='test_data.bin',
+                                   dtype=np.float64, rng=None, out_points=None):
+    """
+    Generate test data with specific DBSCAN parameters
+    dtype, rng and out_points are passed through to sample_points.
+    """
+    X, _ = sample_points(n_samples, n_centers, output_file, dtype, rng, out_points)
 
-    print(f"Generated {len(X)} points with {n_centers} clusters")
-    print(f"Simple clustering found {len(set(labels)) - (1 if -1 in labels else 0)} clusters")
+    # Label the points read back from the file
+    labels, report = _label_and_write(X, n_centers, eps, min_samples, output_file)
+    print(report, end='')
 
-    return X, labels
+    # Return an in-memory copy: the map would break if output_file is rewritten
+    return np.array(X), labels
 
 if __name__ == '__main__':
     if len(sys.argv) > 1 and sys.argv[1] == '--multiple':
@@ -10,31 +10,54 @@
 
 namespace {
 
-std::vector<dbscan::Point<double>> load_points_from_file(const std::string &filename) {
-  std::vector<dbscan::Point<double>> points;
-
-  std::ifstream file(filename, std::ios::binary);
-  if (!file) {
-    throw std::runtime_error("Could not open file: " + filename);
-  }
-
-  // Read number of points
+// File header written by generate_test_data.py: point count, coordinate type
+// code ('d' for double, 'f' for float) and padding to a 16-byte boundary
+struct DataHeader {
   uint32_t n_points;
-  file.read(reinterpret_cast<char *>(&n_points), sizeof(n_points));
+  char dtype;
+  char padding[11];
+};
+static_assert(sizeof(DataHeader) == 16, "points must start 16-byte aligned");
+
+DataHeader read_header(std::ifstream &file, const std::string &filename) {
+  DataHeader header;
+  file.read(reinterpret_cast<char *>(&header), sizeof(header));
+  if (header.dtype != 'd' && header.dtype != 'f') {
+    throw std::runtime_error("Unsupported coordinate type in file: " + filename);
+  }
+  return header;
+}
 
+template <typename T> std::vector<dbscan::Point<double>> read_points(std::ifstream &file, uint32_t n_points) {
+  std::vector<dbscan::Point<double>> points;
   points.reserve(n_points);
 
-  // Read points
   for (uint32_t i = 0; i < n_points; ++i) {
-    double x, y;
+    T x, y;
     file.read(reinterpret_cast<char *>(&x), sizeof(x));
     file.read(reinterpret_cast<char *>(&y), sizeof(y));
-    points.push_back({x, y});
+    points.push_back({static_cast<double>(x), static_cast<double>(y)});
   }
 
   return points;
 }
 
+std::vector<dbscan::Point<double>> load_points_from_file(const std::string &filename) {
+  std::ifstream file(filename, std::ios::binary);
+  if (!file) {
+    throw std::runtime_error("Could not open file: " + filename);
+  }
+
+  // Read number of points and coordinate type
+  DataHeader header = read_header(file, filename);
+
+  // Read points
+  if (header.dtype == 'f') {
+    return read_points<float>(file, header.n_points);
+  }
+  return read_points<double>(file, header.n_points);
+}
+
 std::vector<int32_t> load_labels_from_file(const std::string &filename) {
   std::vector<int32_t> labels;
 
@@ -43,12 +66,13 @@ std::vector<int32_t> load_labels_from_file(const std::string &filename) {
     throw std::runtime_error("Could not open file: " + filename);
   }
 
-  // Read number of points
-  uint32_t n_points;
-  file.read(reinterpret_cast<char *>(&n_points), sizeof(n_points));
+  // Read number of points and coordinate type
+  DataHeader header = read_header(file, filename);
+  uint32_t n_points = header.n_points;
 
   // Skip points data
-  file.seekg(sizeof(double) * 2 * n_points, std::ios::cur);
+  std::size_t coord_size = header.dtype == 'f' ? sizeof(float) : sizeof(double);
+  file.seekg(coord_size * 2 * n_points, std::ios::cur);
 
   labels.reserve(n_points);
 
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Checks the ground-truth labeler in generate_test_data.py against a brute-force
+O(N^2) reference. Runs under pytest or directly: python3 tests/test_generate_test_data.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from generate_test_data import GridIndex, label_points  # noqa: E402
+
+
+def brute_force_neighbors(X, i, eps):
+    """Indices of all points within eps of point i (squared-distance test), excluding i"""
+    diff = X - X[i]
+    d2 = np.einsum('ij,ij->i', diff, diff)
+    neighbors = np.flatnonzero(d2 <= eps * eps) if eps >= 0 else np.empty(0, dtype=np.intp)
+    return neighbors[neighbors != i]
+
+
+def brute_force_labels(X, eps, min_samples):
+    """Same simplified DBSCAN as label_points, scanning every pair"""
+    labels = np.full(len(X), -1, dtype=np.int32)
+    cluster_id = 0
+    for i in range(len(X)):
+        if labels[i] != -1:
+            continue
+        neighbors = brute_force_neighbors(X, i, eps)
+        if len(neighbors) >= min_samples:
+            labels[i] = cluster_id
+            labels[neighbors[labels[neighbors] == -1]] = cluster_id
+            cluster_id += 1
+    return labels
+
+
+def random_cases(n_cases=300, seed=0):
+    """Yield (X, eps, min_samples), many on coordinates quantized to multiples of eps"""
+    rng = np.random.default_rng(seed)
+    for case in range(n_cases):
+        n = int(rng.integers(1, 120))
+        eps = float(rng.choice([0.1, 0.3, 0.5, 0.8, 1.2, 2.5]))
+        min_samples = int(rng.integers(1, 6))
+        if case % 2:
+            # Points on a lattice of eps / k, where many pairs are exactly eps apart
+            step = eps / int(rng.integers(1, 4))
+            X = rng.integers(-40, 40, size=(n, 2)) * step
+        else:
+            X = rng.normal(0, 2, size=(n, 2))
+        yield X, eps, min_samples
+
+
+def test_rounding_at_cell_edges():
+    # Points exactly eps apart whose cells used to round two rows apart
+    X = np.array([[0.5, 0.4], [0.5, -0.4], [0.5, -4.4]])
+    np.testing.assert_array_equal(GridIndex(X, 0.8).query_radius(0, 0.8 * 0.8), [1])
+    np.testing.assert_array_equal(label_points(X, 0.8, 1), [0, 0, -1])
+
+
+def test_labels_match_brute_force():
+    for X, eps, min_samples in random_cases():
+        np.testing.assert_array_equal(label_points(X, eps, min_samples),
+                                      brute_force_labels(X, eps, min_samples))
+
+
+def test_block_counts_bound_neighbor_counts():
+    # label_points skips points with block_counts <= min_samples, which is only
+    # safe while the block count bounds the true neighbor count from above
+    for X, eps, _ in random_cases():
+        block_counts = GridIndex(X, eps).block_counts()
+        for i in range(len(X)):
+            assert block_counts[i] >= len(brute_force_neighbors(X, i, eps)) + 1
+
+
+def test_degenerate_inputs():
+    assert len(label_points(np.empty((0, 2)), 0.8, 5)) == 0
+
+    rng = np.random.default_rng(1)
+    X = rng.normal(0, 1, size=(200, 2))
+    X[::37] = np.nan
+    X[5] = [np.inf, 0.0]
+    with np.errstate(invalid='ignore'):
+        for eps, min_samples in [(0.3, 3), (1e-3, 1), (0.0, 1), (1e-300, 1), (-1.0, 1)]:
+            np.testing.assert_array_equal(label_points(X, eps, min_samples),
+                                          brute_force_labels(X, eps, min_samples))
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f"{name} passed")